@@ -5,6 +5,7 @@ Connectors are imported from connectors.py
 """
 import json
 import math
+import time
 import asyncio
 from datetime import datetime
 from typing import List, Optional, Callable, Any
@@ -15,8 +16,9 @@ from autogen_core.tools import FunctionTool
 from pydantic import ValidationError
 
 import prompts
+import serialization
 
-from model import get_gemini_client
+from model import ModelRouter, get_model_router
 # Schemas
 from schemas import (
     DiscoveryOutput,
@@ -27,7 +29,12 @@ from schemas import (
     ComparisonSchema,
     ComparisonRow,
     FinalOutputSchema,
+    ConnectorHealthSchema,
 )
+from connector_health import ConnectorHealthRegistry, default_registry
+from structured_output import run_with_schema
+from discovery_cache import DiscoveryCache, default_cache
+from product_index import ProductIndex, ENRICHMENT_FIELDS, default_index
 
 # Connectors
 from connectors import (
@@ -41,8 +48,15 @@ from connectors import (
 # DiscoveryAgent
 # --------------------------------------------------------------------
 class DiscoveryAgent:
-    def __init__(self, system_prompt: Optional[str] = None):
-        self.client = get_gemini_client(response_format = DiscoveryOutput)
+    def __init__(
+        self,
+        system_prompt: Optional[str] = None,
+        cache: Optional[DiscoveryCache] = None,
+        router: Optional[ModelRouter] = None,
+    ):
+        self.router = router or get_model_router()
+        self.tier = self.router.tier_for("discovery")
+        self.client = self.router.get_client(self.tier, response_format = DiscoveryOutput)
         google_search_tool = FunctionTool(google_search, description="Google Search", strict = True)
 
         self.agent = AssistantAgent(
@@ -53,11 +67,23 @@ class DiscoveryAgent:
                 output_content_type_format= DiscoveryOutput,
                 reflect_on_tool_use=True,
             )
+        self.cache = cache or default_cache
         
 
     async def classify(self, keyword: str) -> DiscoveryOutput:
+        # cache / local classifier first; the LLM + search round trip is the slow path
+        cached = self.cache.get(keyword) or self.cache.predict(keyword)
+        if cached is not None:
+            return cached
         msg = prompts.discovery_user_prompt(keyword)
-        out = await self.agent.run(task=msg)
+        out = await run_with_schema(
+            self.agent,
+            msg,
+            DiscoveryOutput,
+            defaults={"keyword": keyword},
+            on_attempt=self.router.recorder("discovery", self.tier),
+        )
+        self.cache.put(keyword, out)
         return out
 
 
@@ -65,26 +91,59 @@ class DiscoveryAgent:
 # RetrievalAgent
 # --------------------------------------------------------------------
 class RetrievalAgent:
-    def __init__(self, system_prompt: Optional[str] = None, connectors: Optional[List[Callable]] = None):
-        self.client = get_gemini_client()
+    def __init__(
+        self,
+        system_prompt: Optional[str] = None,
+        connectors: Optional[List[Callable]] = None,
+        health: Optional[ConnectorHealthRegistry] = None,
+        router: Optional[ModelRouter] = None,
+    ):
+        self.router = router or get_model_router()
+        self.tier = self.router.tier_for("retrieval")
+        self.client = self.router.get_client(self.tier)
         self.agent = AssistantAgent(
             name="retrieval_agent",
             model_client=self.client,
             system_message=system_prompt or prompts.RETRIEVAL_SYSTEM,
         )
         self.connectors = connectors or [serpapi_amazon_search, ddg_fallback_search]
+        self.health = health or default_registry
+
+    def connector_health(self) -> List[ConnectorHealthSchema]:
+        """Health snapshot of every connector seen so far (for monitoring)."""
+        return self.health.snapshot()
 
-    async def run(self, keyword: str, domain: str = "physical_product", limit_per_connector: int = 5) -> RetrievalResultSchema:
+    async def run(
+        self,
+        keyword: str,
+        domain: str = "physical_product",
+        limit_per_connector: int = 5,
+        target_total: Optional[int] = None,
+    ) -> RetrievalResultSchema:
         all_items = []
-        for connector in self.connectors:
+        for connector in self.health.order(self.connectors):
+            if target_total is not None and len(all_items) >= target_total:
+                break
+            h = self.health.get(connector)
+            if not h.allow():
+                print(f"[RetrievalAgent] skipping {h.name}: circuit {h.state}")
+                continue
+            start = time.perf_counter()
             try:
                 items = connector(keyword, limit_per_connector)
-                if items:
-                    all_items.extend(items)
             except Exception as e:
-                print(f"[RetrievalAgent] {connector.__name__} failed: {e}")
+                h.record_failure(time.perf_counter() - start, str(e))
+                print(f"[RetrievalAgent] {h.name} failed: {e}")
+                continue
+            elapsed = time.perf_counter() - start
+            if isinstance(items, str):
+                # connectors report missing keys / API errors as strings
+                h.record_failure(elapsed, items)
+                print(f"[RetrievalAgent] {h.name} failed: {items}")
                 continue
-        print(self.connectors)
+            items = [it for it in (items or []) if isinstance(it, dict) and it.get("title")]
+            h.record_success(elapsed, len(items))
+            all_items.extend(items)
         normalized: List[RawProductSchema] = []
         for it in all_items:
             try:
@@ -123,29 +182,77 @@ class RetrievalAgent:
 # # ProcessingAgent
 # # --------------------------------------------------------------------
 class ProcessingAgent:
-    def __init__(self, system_prompt: Optional[str] = None):
-        self.client = get_gemini_client()
-        self.agent = AssistantAgent(
-            name="processing_agent",
-            model_client=self.client,
-            system_message=system_prompt or prompts.PROCESSING_SYSTEM,
+    def __init__(
+        self,
+        system_prompt: Optional[str] = None,
+        index: Optional[ProductIndex] = None,
+        router: Optional[ModelRouter] = None,
+    ):
+        self.router = router or get_model_router()
+        self.tier = self.router.tier_for("processing")
+        self.client = self.router.get_client(self.tier)
+        # per-product calls go straight to the client: no shared chat history,
+        # so products can be analyzed concurrently without leaking into each other
+        self.system_prompt = system_prompt or prompts.PROCESSING_SYSTEM
+        # stronger tier used only when the bulk tier's output fails validation
+        escalation = self.router.escalation_tier(self.tier)
+        self.escalation_client = self.router.get_client(escalation) if escalation else None
+        self.index = index or default_index
+
+    def _reuse(self, raw: RawProductSchema, known: ProcessedProductSchema) -> ProcessedProductSchema:
+        """Fresh listing fields from raw, enrichment from an already processed product."""
+        return ProcessedProductSchema(
+            product_id=raw.product_id,
+            title=raw.title,
+            url=str(raw.url) if raw.url else None,
+            price=raw.price,
+            currency=raw.currency,
+            rating=raw.rating,
+            review_count=raw.review_count,
+            image_url=raw.image_url,
+            source=raw.source,
+            extra={**(known.extra or {}), "reused_from": known.product_id or known.title},
+            **{f: getattr(known, f) for f in ENRICHMENT_FIELDS},
         )
 
     async def analyze_product(self, raw: RawProductSchema, domain: str = "") -> ProcessedProductSchema:
-        raw_json = raw.model_dump()
+        known = self.index.lookup(raw)
+        if known is not None:
+            return self._reuse(raw, known)
+        raw_json = raw.model_dump(mode="json")
         prompt_text = prompts.processing_single_prompt(json.dumps(raw_json), domain)
         msg = UserMessage(content=prompt_text, source="user")
-        return await run_with_schema(self.agent, msg, ProcessedProductSchema)
+        processed = await run_with_schema(
+            self.client,
+            msg,
+            ProcessedProductSchema,
+            system_message=self.system_prompt,
+            defaults={"title": raw.title},
+            fallback_model=self.escalation_client,
+            on_attempt=self.router.recorder("processing", self.tier),
+        )
+        # ids come from retrieval, never from the LLM echo; they key the index and comparison rows
+        processed.product_id = raw.product_id
+        processed.source = raw.source
+        return processed
 
     async def run(self, retrieval_result: RetrievalResultSchema) -> ProcessingResultSchema:
         tasks = [self.analyze_product(r, retrieval_result.domain) for r in retrieval_result.products]
         processed_list = await asyncio.gather(*tasks) if tasks else []
+        fresh = [p for p in processed_list if "reused_from" not in (p.extra or {})]
+        if fresh:
+            self.index.add(fresh)
+            await asyncio.to_thread(self.index.save)
         return ProcessingResultSchema(
             keyword=retrieval_result.keyword,
             domain=retrieval_result.domain,
             processed=list(processed_list),
         )
 
+    def similar_products(self, query: str, k: int = 5) -> List[ProcessedProductSchema]:
+        """Already processed products most similar to the query text."""
+        return [p for p, _ in self.index.similar(query, k)]
+
 
 # # --------------------------------------------------------------------
 # # ComparisonAgent
@@ -158,13 +265,11 @@ def _simple_score_from_processed(p: ProcessedProductSchema) -> float:
 
 
 class ComparisonAgent:
-    def __init__(self, system_prompt: Optional[str] = None):
-        self.client = get_gemini_client()
-        self.agent = AssistantAgent(
-            name="comparison_agent",
-            model_client=self.client,
-            system_message=system_prompt or prompts.COMPARISON_SYSTEM,
-        )
+    def __init__(self, system_prompt: Optional[str] = None, router: Optional[ModelRouter] = None):
+        self.router = router or get_model_router()
+        self.tier = self.router.tier_for("comparison")
+        self.client = self.router.get_client(self.tier)
+        self.system_prompt = system_prompt or prompts.COMPARISON_SYSTEM
 
     async def run(self, processing_result: ProcessingResultSchema) -> ComparisonSchema:
         rows = [
@@ -192,7 +297,14 @@ class ComparisonAgent:
             for r in rows_sorted[:20]
         )
         msg = UserMessage(content=prompts.comparison_pick_prompt(table_text), source="user")
-        comp = await run_with_schema(self.agent, msg, ComparisonSchema)
+        comp = await run_with_schema(
+            self.client,
+            msg,
+            ComparisonSchema,
+            system_message=self.system_prompt,
+            defaults={"keyword": processing_result.keyword, "domain": processing_result.domain},
+            on_attempt=self.router.recorder("comparison", self.tier),
+        )
 
         comp.keyword = processing_result.keyword
         comp.domain = processing_result.domain
@@ -226,3 +338,7 @@ class OutputAgent:
             comparison=comparison,
         )
         return final
+
+    def serialize(self, final: FinalOutputSchema, compact: bool = True) -> bytes:
+        """JSON bytes for API responses / storage; compact rows reference products by index."""
+        return serialization.dumps(final, compact=compact)
@@ -0,0 +1,161 @@
+# connector_health.py
+"""
+Health tracking and circuit breakers for retrieval connectors.
+Used by RetrievalAgent to order connectors by observed yield and to skip
+connectors that keep failing.
+"""
+import time
+from typing import Callable, Dict, List, Optional
+
+from schemas import ConnectorHealthSchema
+
+CLOSED = "closed"
+OPEN = "open"
+HALF_OPEN = "half_open"
+
+
+# --------------------------------------------------------------------
+# Per-connector health
+# --------------------------------------------------------------------
+class ConnectorHealth:
+    """Error-rate / latency / yield EWMAs plus a circuit breaker for one connector."""
+
+    def __init__(
+        self,
+        name: str,
+        alpha: float = 0.3,
+        failure_threshold: int = 3,
+        empty_threshold: int = 3,
+        cooldown_s: float = 30.0,
+        max_cooldown_s: float = 600.0,
+        clock: Callable[[], float] = time.monotonic,
+    ):
+        self.name = name
+        self.alpha = alpha
+        self.failure_threshold = failure_threshold
+        self.empty_threshold = empty_threshold
+        self.base_cooldown_s = cooldown_s
+        self.cooldown_s = cooldown_s
+        self.max_cooldown_s = max_cooldown_s
+        self.clock = clock
+
+        self.state = CLOSED
+        self.consecutive_failures = 0
+        self.consecutive_empty = 0
+        self.opened_at: Optional[float] = None
+        self.probe_in_flight = False
+
+        self.error_rate: float = 0.0
+        self.latency_s: Optional[float] = None
+        self.yield_per_s: Optional[float] = None
+        self.calls = 0
+        self.failures = 0
+        self.last_error: Optional[str] = None
+
+    def _ewma(self, prev: Optional[float], value: float) -> float:
+        return value if prev is None else self.alpha * value + (1 - self.alpha) * prev
+
+    def allow(self) -> bool:
+        """True if the connector may be called now. Moves open -> half_open after the cooldown."""
+        if self.state == CLOSED:
+            return True
+        if self.state == OPEN and self.clock() - (self.opened_at or 0) >= self.cooldown_s:
+            self.state = HALF_OPEN
+            self.probe_in_flight = False
+        if self.state == HALF_OPEN and not self.probe_in_flight:
+            # only a single probe request while half-open
+            self.probe_in_flight = True
+            return True
+        return False
+
+    def record_success(self, latency_s: float, useful: int) -> None:
+        self.calls += 1
+        self.error_rate = self._ewma(self.error_rate, 0.0)
+        self.latency_s = self._ewma(self.latency_s, latency_s)
+        self.yield_per_s = self._ewma(self.yield_per_s, useful / max(latency_s, 1e-3))
+        self.consecutive_failures = 0
+        self.probe_in_flight = False
+        if useful == 0:
+            # soft failure: e.g. a rate-limited API answering with an empty result
+            self.consecutive_empty += 1
+            if self.state == HALF_OPEN:
+                self.cooldown_s = min(self.cooldown_s * 2, self.max_cooldown_s)
+                self._open()
+            elif self.consecutive_empty >= self.empty_threshold:
+                self._open()
+            return
+        self.consecutive_empty = 0
+        if self.state != CLOSED:
+            self.state = CLOSED
+            self.opened_at = None
+            self.cooldown_s = self.base_cooldown_s
+
+    def record_failure(self, latency_s: float, error: str) -> None:
+        self.calls += 1
+        self.failures += 1
+        self.error_rate = self._ewma(self.error_rate, 1.0)
+        self.latency_s = self._ewma(self.latency_s, latency_s)
+        self.yield_per_s = self._ewma(self.yield_per_s, 0.0)
+        self.consecutive_failures += 1
+        self.last_error = error
+        self.probe_in_flight = False
+        if self.state == HALF_OPEN:
+            # failed probe: re-open with a longer cooldown
+            self.cooldown_s = min(self.cooldown_s * 2, self.max_cooldown_s)
+            self._open()
+        elif self.consecutive_failures >= self.failure_threshold:
+            self._open()
+
+    def _open(self) -> None:
+        self.state = OPEN
+        self.opened_at = self.clock()
+
+    def snapshot(self) -> ConnectorHealthSchema:
+        return ConnectorHealthSchema(
+            name=self.name,
+            state=self.state,
+            calls=self.calls,
+            failures=self.failures,
+            consecutive_failures=self.consecutive_failures,
+            consecutive_empty=self.consecutive_empty,
+            error_rate=round(self.error_rate, 4),
+            latency_ms=round(self.latency_s * 1000, 1) if self.latency_s is not None else None,
+            yield_per_s=round(self.yield_per_s, 4) if self.yield_per_s is not None else None,
+            last_error=self.last_error,
+        )
+
+
+# --------------------------------------------------------------------
+# Registry
+# --------------------------------------------------------------------
+class ConnectorHealthRegistry:
+    """Holds ConnectorHealth per connector name and decides call order."""
+
+    def __init__(self, **health_kwargs):
+        self.health_kwargs = health_kwargs
+        self.health: Dict[str, ConnectorHealth] = {}
+
+    def get(self, connector: Callable) -> ConnectorHealth:
+        name = getattr(connector, "__name__", repr(connector))
+        if name not in self.health:
+            self.health[name] = ConnectorHealth(name, **self.health_kwargs)
+        return self.health[name]
+
+    def order(self, connectors: List[Callable]) -> List[Callable]:
+        """
+        Connectors sorted by observed yield (useful products per second), best first.
+        Untried connectors keep their configured position ahead of known-bad ones.
+        """
+        def key(item):
+            idx, c = item
+            y = self.get(c).yield_per_s
+            return (-(y if y is not None else float("inf")), idx)
+
+        return [c for _, c in sorted(enumerate(connectors), key=key)]
+
+    def snapshot(self) -> List[ConnectorHealthSchema]:
+        return [h.snapshot() for h in self.health.values()]
+
+
+# Shared across RetrievalAgent instances so health survives per-request agents.
+default_registry = ConnectorHealthRegistry()
@@ -0,0 +1,228 @@
+# discovery_cache.py
+"""
+Keyword cache and local pre-classifier for DiscoveryAgent.
+Normalized / near-identical keywords are answered from the cache; a small
+naive Bayes model trained on cached history answers obvious keywords
+without an LLM call.
+"""
+import os
+import re
+import json
+import math
+import difflib
+from collections import Counter, defaultdict
+from typing import Dict, List, Optional, Tuple
+
+from schemas import DiscoveryOutput
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+# Small smoothing prior for the classifier. Seeds alone never let the
+# classifier answer; see DiscoveryCache.min_history.
+SEED_EXAMPLES: List[Tuple[str, str]] = [
+    ("iphone 15", "physical_product"),
+    ("samsung galaxy phone", "physical_product"),
+    ("wireless earbuds", "physical_product"),
+    ("laptop", "physical_product"),
+    ("running shoes", "physical_product"),
+    ("heating pad", "physical_product"),
+    ("todo list app", "app"),
+    ("fitness tracker app", "app"),
+    ("photo editor app android", "app"),
+    ("kindle ebook thriller novel", "ebook"),
+    ("python programming ebook", "ebook"),
+    ("logo design template", "design"),
+    ("ui kit figma design", "design"),
+    ("restaurants near me", "location"),
+    ("hotels in goa", "location"),
+]
+
+
+def normalize_keyword(keyword: str) -> str:
+    """Lowercase, drop punctuation and collapse whitespace."""
+    return " ".join(_TOKEN_RE.findall(keyword.lower()))
+
+
+def _number_tokens(norm: str) -> frozenset:
+    """Tokens containing digits, e.g. model numbers ('15', 's23')."""
+    return frozenset(t for t in norm.split() if any(ch.isdigit() for ch in t))
+
+
+# Words that on their own move a keyword to another domain
+# ('nike running shoes' vs 'nike running shoes app').
+DOMAIN_HINT_WORDS = frozenset({
+    "app", "apps", "application", "android", "ios", "software", "game",
+    "ebook", "ebooks", "book", "books", "novel", "kindle", "pdf", "audiobook",
+    "design", "designs", "template", "templates", "logo", "font", "mockup", "ui",
+    "near", "nearby", "hotel", "hotels", "restaurant", "restaurants", "cafe", "shop", "store",
+})
+
+
+def _guard_tokens(norm: str) -> frozenset:
+    """Tokens that must match exactly for a fuzzy hit: model numbers and domain hints."""
+    return _number_tokens(norm) | frozenset(t for t in norm.split() if t in DOMAIN_HINT_WORDS)
+
+
+def _features(norm: str) -> List[str]:
+    feats = []
+    for tok in norm.split():
+        feats.append(f"w:{tok}")
+        padded = f"^{tok}$"
+        feats.extend(f"c:{padded[i:i + 3]}" for i in range(len(padded) - 2))
+    return feats
+
+
+# --------------------------------------------------------------------
+# Local classifier
+# --------------------------------------------------------------------
+class KeywordClassifier:
+    """Multinomial naive Bayes over word + char-trigram features."""
+
+    def __init__(self, seed: Optional[List[Tuple[str, str]]] = None):
+        self.doc_counts: Counter = Counter()
+        self.feat_counts: Dict[str, Counter] = defaultdict(Counter)
+        self.feat_totals: Counter = Counter()
+        self.vocab: set = set()
+        self.history = 0  # examples learned from real (LLM-classified) keywords
+        for kw, domain in seed if seed is not None else SEED_EXAMPLES:
+            self.add(kw, domain, seed=True)
+
+    def add(self, keyword: str, domain: str, seed: bool = False) -> None:
+        if not seed:
+            self.history += 1
+        feats = _features(normalize_keyword(keyword))
+        self.doc_counts[domain] += 1
+        self.feat_counts[domain].update(feats)
+        self.feat_totals[domain] += len(feats)
+        self.vocab.update(feats)
+
+    def word_matches(self, keyword: str, domain: str) -> int:
+        """Number of the keyword's words seen in training examples of domain."""
+        counts = self.feat_counts.get(domain, {})
+        return sum(1 for f in _features(normalize_keyword(keyword)) if f.startswith("w:") and counts.get(f))
+
+    def predict(self, keyword: str) -> Tuple[Optional[str], float]:
+        """Returns (domain, posterior probability), or (None, 0.0) with no data."""
+        feats = [f for f in _features(normalize_keyword(keyword)) if f in self.vocab]
+        total_docs = sum(self.doc_counts.values())
+        if not feats or not total_docs:
+            return None, 0.0
+        v = len(self.vocab)
+        log_post = {}
+        for domain, n in self.doc_counts.items():
+            counts, denom = self.feat_counts[domain], self.feat_totals[domain] + v
+            log_post[domain] = math.log(n / total_docs) + sum(
+                math.log((counts[f] + 1) / denom) for f in feats
+            )
+        best = max(log_post, key=log_post.get)
+        norm = sum(math.exp(lp - log_post[best]) for lp in log_post.values())
+        return best, 1.0 / norm
+
+
+# --------------------------------------------------------------------
+# Cache
+# --------------------------------------------------------------------
+class DiscoveryCache:
+    """Normalized-keyword cache of DiscoveryOutput with fuzzy lookup, optionally persisted to JSON."""
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        fuzzy_cutoff: float = 0.9,
+        classifier_threshold: float = 0.98,
+        min_history: int = 50,
+        min_word_matches: int = 2,
+        max_entries: int = 5000,
+    ):
+        self.path = path
+        self.fuzzy_cutoff = fuzzy_cutoff
+        # naive Bayes posteriors are poorly calibrated on little data, so the
+        # classifier only answers once it has real history and word-level support
+        self.classifier_threshold = classifier_threshold
+        self.min_history = min_history
+        self.min_word_matches = min_word_matches
+        self.max_entries = max_entries
+        self.entries: Dict[str, DiscoveryOutput] = {}
+        self.classifier = KeywordClassifier()
+        self.hits = {"exact": 0, "fuzzy": 0, "classifier": 0, "miss": 0}
+        if path and os.path.exists(path):
+            self._load()
+
+    def _load(self) -> None:
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                data = json.load(f)
+            for norm, item in data.items():
+                out = DiscoveryOutput.model_validate(item)
+                self.entries[norm] = out
+                self.classifier.add(norm, out.domain)
+        except Exception as e:
+            print(f"[DiscoveryCache] failed to load {self.path}: {e}")
+
+    def _save(self) -> None:
+        if not self.path:
+            return
+        tmp = f"{self.path}.tmp"
+        with open(tmp, "w", encoding="utf-8") as f:
+            json.dump({k: v.model_dump() for k, v in self.entries.items()}, f)
+        os.replace(tmp, self.path)
+
+    def get(self, keyword: str) -> Optional[DiscoveryOutput]:
+        """
+        Cached result for the keyword. An exact (normalized) hit is returned
+        whole; a fuzzy hit only lends its domain and platforms, and must have
+        the same model-number and domain-hint tokens ('iphone 14 pro' never
+        matches '15 pro', 'running shoes' never matches 'running shoes app').
+        """
+        norm = normalize_keyword(keyword)
+        hit = self.entries.get(norm)
+        if hit is not None:
+            self.hits["exact"] += 1
+            return hit.model_copy(update={"keyword": keyword})
+        guard = _guard_tokens(norm)
+        candidates = [k for k in self.entries if _guard_tokens(k) == guard]
+        close = difflib.get_close_matches(norm, candidates, n=1, cutoff=self.fuzzy_cutoff)
+        if not close:
+            return None
+        self.hits["fuzzy"] += 1
+        hit = self.entries[close[0]]
+        return hit.model_copy(update={"keyword": keyword, "products": []})
+
+    def predict(self, keyword: str) -> Optional[DiscoveryOutput]:
+        """High-confidence local classification, or None to fall through to the LLM."""
+        if self.classifier.history < self.min_history:
+            self.hits["miss"] += 1
+            return None
+        domain, prob = self.classifier.predict(keyword)
+        if (
+            domain is None
+            or prob < self.classifier_threshold
+            or self.classifier.word_matches(keyword, domain) < self.min_word_matches
+        ):
+            self.hits["miss"] += 1
+            return None
+        self.hits["classifier"] += 1
+        platforms = Counter(
+            p for out in self.entries.values() if out.domain == domain for p in out.recommended_platforms
+        )
+        return DiscoveryOutput(
+            keyword=keyword,
+            domain=domain,
+            confidence=round(prob, 4),
+            recommended_platforms=[p for p, _ in platforms.most_common(5)],
+            products=[],
+        )
+
+    def put(self, keyword: str, output: DiscoveryOutput) -> None:
+        norm = normalize_keyword(keyword)
+        if norm in self.entries:
+            del self.entries[norm]
+        elif len(self.entries) >= self.max_entries:
+            # drop the oldest entry
+            self.entries.pop(next(iter(self.entries)))
+        self.entries[norm] = output
+        self.classifier.add(norm, output.domain)
+        self._save()
+
+
+default_cache = DiscoveryCache(path=os.getenv("DISCOVERY_CACHE_PATH"))
@@ -11,6 +11,7 @@ from autogen_ext.models.openai import OpenAIChatCompletionClient
 import asyncio
 from autogen_core.models import ModelInfo
 from pydantic import BaseModel
+from typing import Callable, Dict, List, Optional
 
 
 # Load environment variables from a .env file
@@ -32,7 +33,7 @@ def get_gemini_client(model_name: str = "gemini-2.5-flash", response_format:Base
     
     try:
         model_client = OpenAIChatCompletionClient(
-        model="gemini-2.5-flash",
+        model=model_name,
         model_info=ModelInfo(vision=True, function_calling=True, json_output=True, family="unknown", structured_output=True),
         api_key = api_key,
         response_format = response_format,
@@ -42,6 +43,106 @@ def get_gemini_client(model_name: str = "gemini-2.5-flash", response_format:Base
     except Exception as e:
         raise RuntimeError(f"Failed to initialize Gemini model: {e}")
 
+# --------------------------------------------------------------------
+# Model routing: per-agent tiers with escalation
+# --------------------------------------------------------------------
+# Tiers ordered cheapest -> strongest; escalation moves one step right.
+TIER_ORDER: List[str] = ["fast", "strong"]
+
+DEFAULT_TIER_MODELS: Dict[str, str] = {
+    "fast": "gemini-2.5-flash-lite",
+    "strong": "gemini-2.5-flash",
+}
+
+# Bulk per-product work runs on the fast tier; classification and the
+# final comparison stay on the strong tier.
+DEFAULT_ROUTES: Dict[str, str] = {
+    "discovery": "strong",
+    "retrieval": "fast",
+    "processing": "fast",
+    "comparison": "strong",
+}
+
+
+class ModelRouter:
+    """
+    Maps agent tasks to model tiers and records routing decisions and per-tier latency.
+    Tier models can be overridden with MODEL_TIER_<TIER>, routes with MODEL_ROUTE_<TASK>.
+    """
+
+    def __init__(self, tier_models: Optional[Dict[str, str]] = None, routes: Optional[Dict[str, str]] = None):
+        load_dotenv()
+        self.tier_models = {
+            tier: os.getenv(f"MODEL_TIER_{tier.upper()}", model)
+            for tier, model in (tier_models or DEFAULT_TIER_MODELS).items()
+        }
+        self.routes = {
+            task: os.getenv(f"MODEL_ROUTE_{task.upper()}", tier)
+            for task, tier in (routes or DEFAULT_ROUTES).items()
+        }
+        self.decisions: Dict[str, Dict[str, int]] = {}
+        self.tier_stats: Dict[str, Dict[str, float]] = {}
+
+    def tier_for(self, task: str) -> str:
+        tier = self.routes.get(task, TIER_ORDER[-1])
+        return tier if tier in self.tier_models else TIER_ORDER[-1]
+
+    def escalation_tier(self, tier: str) -> Optional[str]:
+        """Next stronger tier, or None if already at the top."""
+        idx = TIER_ORDER.index(tier) if tier in TIER_ORDER else len(TIER_ORDER) - 1
+        return TIER_ORDER[idx + 1] if idx + 1 < len(TIER_ORDER) else None
+
+    def get_client(self, tier: str, response_format: BaseModel = None):
+        return get_gemini_client(model_name=self.tier_models[tier], response_format=response_format)
+
+    def record(self, task: str, tier: str, latency_s: float, ok: bool, escalated: bool = False) -> None:
+        d = self.decisions.setdefault(task, {})
+        key = f"{tier}:escalated" if escalated else tier
+        d[key] = d.get(key, 0) + 1
+        t = self.tier_stats.setdefault(tier, {"calls": 0, "failures": 0, "total_s": 0.0, "max_s": 0.0})
+        t["calls"] += 1
+        t["failures"] += 0 if ok else 1
+        t["total_s"] += latency_s
+        t["max_s"] = max(t["max_s"], latency_s)
+
+    def recorder(self, task: str, tier: str) -> Callable[[bool, float, bool], None]:
+        """Callback for run_with_schema(on_attempt=...)."""
+        escalation = self.escalation_tier(tier)
+
+        def _record(escalated: bool, latency_s: float, ok: bool) -> None:
+            used = escalation if escalated and escalation else tier
+            self.record(task, used, latency_s, ok, escalated=escalated)
+
+        return _record
+
+    def stats(self) -> dict:
+        return {
+            "routes": dict(self.routes),
+            "decisions": {task: dict(d) for task, d in self.decisions.items()},
+            "tiers": {
+                tier: {
+                    "model": self.tier_models.get(tier),
+                    "calls": int(t["calls"]),
+                    "failures": int(t["failures"]),
+                    "avg_latency_ms": round(t["total_s"] * 1000 / t["calls"], 1) if t["calls"] else 0.0,
+                    "max_latency_ms": round(t["max_s"] * 1000, 1),
+                }
+                for tier, t in self.tier_stats.items()
+            },
+        }
+
+
+_default_router: Optional[ModelRouter] = None
+
+
+def get_model_router() -> ModelRouter:
+    """Process-wide router shared by the agents."""
+    global _default_router
+    if _default_router is None:
+        _default_router = ModelRouter()
+    return _default_router
+
+
 async def main():
     """
     Main asynchronous function to interact with the Gemini model.
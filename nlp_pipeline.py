@@ -5,6 +5,15 @@ Pipeline orchestrator that runs agents in sequence.
 
 import asyncio
 from agents import DiscoveryAgent, RetrievalAgent, ProcessingAgent, ComparisonAgent, OutputAgent
+import structured_output
+import serialization
+from model import get_model_router
+
+# Retrieval stops once this many products are collected. At twice the
+# per-connector limit at least two sources are always compared; further,
+# lower-yield connectors are only called when those come up short.
+RETRIEVAL_LIMIT_PER_CONNECTOR = 5
+RETRIEVAL_TARGET_TOTAL = 2 * RETRIEVAL_LIMIT_PER_CONNECTOR
 
 async def run_pipeline(keyword: str):
     # Step 1: Discovery
@@ -14,7 +23,12 @@ async def run_pipeline(keyword: str):
 
     # Step 2: Retrieval
     retrieval_agent = RetrievalAgent()
-    retrieval_result = await retrieval_agent.run(keyword, domain=domain_info.domain)
+    retrieval_result = await retrieval_agent.run(
+        keyword,
+        domain=domain_info.domain,
+        limit_per_connector=RETRIEVAL_LIMIT_PER_CONNECTOR,
+        target_total=RETRIEVAL_TARGET_TOTAL,
+    )
     print("Retrieved:", len(retrieval_result.products), "items")
 
     # Step 3: Processing
@@ -30,6 +44,8 @@ async def run_pipeline(keyword: str):
     # Step 5: Output
     output_agent = OutputAgent()
     final_output = output_agent.assemble(processing_result, comparison, domain_info)
+    print("Structured output:", structured_output.stats.as_dict())
+    print("Model routing:", get_model_router().stats())
     return final_output
 
 
@@ -37,4 +53,5 @@ if __name__ == "__main__":
     keyword = "back heating pad"  # test input
     result = asyncio.run(run_pipeline(keyword))
     print("\n=== FINAL OUTPUT ===")
-    print(result.model_dump_json(indent=2))
+    print(serialization.dumps(result).decode("utf-8"))
+    print("Serialization:", serialization.measure(result))
@@ -0,0 +1,208 @@
+# product_index.py
+"""
+Local vector index over processed products.
+Lets ProcessingAgent reuse enrichment (summary, pros, cons, sentiment) for
+products already processed under another keyword, and serves a
+"similar products" query. Works offline: the default embedder is a
+hashing vectorizer; a sentence-transformers model is used if installed
+and requested.
+"""
+import os
+import re
+import json
+import zlib
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+
+from schemas import ProcessedProductSchema, RawProductSchema
+
+_TOKEN_RE = re.compile(r"[a-z0-9]+")
+
+# fields copied from an indexed product when its enrichment is reused
+ENRICHMENT_FIELDS = ("summary", "pros", "cons", "sentiment", "sentiment_score")
+
+
+# --------------------------------------------------------------------
+# Embedders
+# --------------------------------------------------------------------
+class HashingEmbedder:
+    """Signed feature hashing of word unigrams/bigrams and char trigrams, L2-normalized."""
+
+    def __init__(self, dim: int = 1024):
+        self.dim = dim
+        self.name = f"hashing-{dim}"
+
+    def _features(self, text: str) -> List[str]:
+        toks = _TOKEN_RE.findall(text.lower())
+        feats = [f"w:{t}" for t in toks]
+        feats += [f"b:{a}_{b}" for a, b in zip(toks, toks[1:])]
+        for t in toks:
+            padded = f"^{t}$"
+            feats += [f"c:{padded[i:i + 3]}" for i in range(len(padded) - 2)]
+        return feats
+
+    def __call__(self, texts: List[str]) -> np.ndarray:
+        out = np.zeros((len(texts), self.dim), dtype=np.float32)
+        for row, text in enumerate(texts):
+            for f in self._features(text):
+                h = zlib.crc32(f.encode("utf-8"))
+                out[row, h % self.dim] += 1.0 if (h >> 31) & 1 else -1.0
+        norms = np.linalg.norm(out, axis=1, keepdims=True)
+        return out / np.maximum(norms, 1e-12)
+
+
+class SentenceTransformerEmbedder:
+    """Local sentence-transformers model (optional dependency)."""
+
+    def __init__(self, model_name: str = "all-MiniLM-L6-v2"):
+        from sentence_transformers import SentenceTransformer
+
+        self.model = SentenceTransformer(model_name)
+        self.name = f"st-{model_name}"
+
+    def __call__(self, texts: List[str]) -> np.ndarray:
+        return np.asarray(self.model.encode(texts, normalize_embeddings=True), dtype=np.float32)
+
+
+def get_embedder(model_name: Optional[str] = None) -> Callable[[List[str]], np.ndarray]:
+    """sentence-transformers model if a name is given and the package is installed, else hashing."""
+    if model_name:
+        try:
+            return SentenceTransformerEmbedder(model_name)
+        except Exception as e:
+            print(f"[ProductIndex] falling back to hashing embedder: {e}")
+    return HashingEmbedder()
+
+
+def _number_tokens(title: str) -> frozenset:
+    """Digit-bearing tokens, i.e. model numbers ('wh 1000xm5', '15', 's23')."""
+    return frozenset(t for t in _TOKEN_RE.findall(title.lower()) if any(ch.isdigit() for ch in t))
+
+
+def product_text(title: str, source: Optional[str] = None) -> str:
+    return f"{title} {source or ''}".strip()
+
+
+# --------------------------------------------------------------------
+# Index
+# --------------------------------------------------------------------
+class ProductIndex:
+    """Brute-force cosine index of ProcessedProductSchema, persisted as <path>.npy + <path>.json."""
+
+    def __init__(
+        self,
+        path: Optional[str] = None,
+        embedder: Optional[Callable[[List[str]], np.ndarray]] = None,
+        reuse_threshold: float = 0.95,
+    ):
+        self.path = path
+        self.embedder = embedder or HashingEmbedder()
+        self.reuse_threshold = reuse_threshold
+        self.items: List[ProcessedProductSchema] = []
+        self.ids: Dict[str, int] = {}
+        self.vectors: Optional[np.ndarray] = None
+        self.hits = 0
+        self.misses = 0
+        if path and os.path.exists(f"{path}.json"):
+            self.load()
+
+    def __len__(self) -> int:
+        return len(self.items)
+
+    def _key(self, product_id: Optional[str], source: Optional[str]) -> Optional[str]:
+        return f"{source or ''}:{product_id}" if product_id else None
+
+    def add(self, products: List[ProcessedProductSchema]) -> None:
+        new = []
+        for p in products:
+            key = self._key(p.product_id, p.source)
+            if key is not None and key in self.ids:
+                self.items[self.ids[key]] = p  # refresh, embedding text is unchanged
+                continue
+            new.append(p)
+        if not new:
+            return
+        vecs = self.embedder([product_text(p.title, p.source) for p in new])
+        self.vectors = vecs if self.vectors is None else np.vstack([self.vectors, vecs])
+        for p in new:
+            key = self._key(p.product_id, p.source)
+            if key is not None:
+                self.ids[key] = len(self.items)
+            self.items.append(p)
+
+    def similar(self, query: str, k: int = 5) -> List[Tuple[ProcessedProductSchema, float]]:
+        """Top-k indexed products by cosine similarity to the query text."""
+        if self.vectors is None or not self.items:
+            return []
+        scores = self.vectors @ self.embedder([query])[0]
+        k = min(k, len(scores))
+        top = np.argpartition(-scores, k - 1)[:k]
+        top = top[np.argsort(-scores[top])]
+        return [(self.items[i], float(scores[i])) for i in top]
+
+    def lookup(self, raw: RawProductSchema, candidates: int = 5) -> Optional[ProcessedProductSchema]:
+        """
+        Previously processed product matching raw by id, or a near-identical
+        title with the same model numbers (XM4 enrichment never goes to an XM5).
+        """
+        key = self._key(raw.product_id, raw.source)
+        if key is not None and key in self.ids:
+            self.hits += 1
+            return self.items[self.ids[key]]
+        numbers = _number_tokens(raw.title)
+        for item, score in self.similar(product_text(raw.title, raw.source), k=candidates):
+            if score < self.reuse_threshold:
+                break
+            if _number_tokens(item.title) == numbers:
+                self.hits += 1
+                return item
+        self.misses += 1
+        return None
+
+    def save(self) -> None:
+        if not self.path or self.vectors is None:
+            return
+        directory = os.path.dirname(self.path)
+        if directory:
+            os.makedirs(directory, exist_ok=True)
+        # both files go through temp files + os.replace so a crash never leaves a partial write
+        with open(f"{self.path}.npy.tmp", "wb") as f:
+            np.save(f, self.vectors)
+        with open(f"{self.path}.json.tmp", "w", encoding="utf-8") as f:
+            json.dump(
+                {
+                    "embedder": getattr(self.embedder, "name", None),
+                    "items": [p.model_dump() for p in self.items],
+                },
+                f,
+            )
+        os.replace(f"{self.path}.npy.tmp", f"{self.path}.npy")
+        os.replace(f"{self.path}.json.tmp", f"{self.path}.json")
+
+    def load(self) -> None:
+        try:
+            with open(f"{self.path}.json", "r", encoding="utf-8") as f:
+                data = json.load(f)
+            items = [ProcessedProductSchema.model_validate(p) for p in data.get("items", [])]
+            vectors = None
+            if data.get("embedder") == getattr(self.embedder, "name", None) and os.path.exists(f"{self.path}.npy"):
+                vectors = np.load(f"{self.path}.npy")
+            if items and (vectors is None or len(vectors) != len(items)):
+                # different embedder or files out of sync: re-embed the stored products
+                vectors = self.embedder([product_text(p.title, p.source) for p in items])
+        except Exception as e:
+            print(f"[ProductIndex] failed to load {self.path}: {e}")
+            return
+        self.items, self.vectors = items, vectors
+        self.ids = {}
+        for i, p in enumerate(items):
+            key = self._key(p.product_id, p.source)
+            if key is not None:
+                self.ids[key] = i
+
+
+default_index = ProductIndex(
+    path=os.getenv("PRODUCT_INDEX_PATH"),
+    embedder=get_embedder(os.getenv("PRODUCT_INDEX_MODEL")),
+)
@@ -89,6 +89,25 @@ Explain reasoning briefly.
 Return ONLY valid JSON according to ComparisonSchema.
 """
 
+# --------------------------------------------------------------------
+# Structured output correction (used by run_with_schema)
+# --------------------------------------------------------------------
+def schema_correction_prompt(schema_name: str, errors: str, previous: str, original: str) -> str:
+    return f"""
+Original task:
+{original}
+
+Your previous answer did not match the {schema_name}.
+
+Fix ONLY these fields:
+{errors}
+
+Previous answer:
+{previous}
+
+Return ONLY the corrected JSON, no explanation.
+"""
+
 # --------------------------------------------------------------------
 # OutputAgent (optional extra prompts)
 # --------------------------------------------------------------------
@@ -46,6 +46,19 @@ class RetrievalResultSchema(BaseModel):
     description: Optional[str] = None
     image_url: Optional[str] = None
 
+class ConnectorHealthSchema(BaseModel):
+    """Monitoring snapshot of a retrieval connector's health."""
+    name: str
+    state: Literal["closed", "open", "half_open"] = "closed"
+    calls: int = 0
+    failures: int = 0
+    consecutive_failures: int = 0
+    consecutive_empty: int = Field(0, description="Consecutive calls that succeeded but returned no useful products")
+    error_rate: float = Field(0.0, description="EWMA of call failures (0..1)")
+    latency_ms: Optional[float] = Field(None, description="EWMA of call latency in milliseconds")
+    yield_per_s: Optional[float] = Field(None, description="EWMA of useful products returned per second")
+    last_error: Optional[str] = None
+
 # Rating Agent's output
 # class RatingSummarySchema(BaseModel):
 #     """Schema for the summary of product reviews and ratings."""
@@ -68,6 +81,7 @@ class RetrievalResultSchema(BaseModel):
 # PROCESSING SCHEMA
 class ProcessedProductSchema(BaseModel):
     """Normalized, LLM/NLP-enriched product representation for comparison & UI."""
+    product_id: Optional[str] = Field(None, description="Identifier carried over from RawProductSchema")
     title: str
     url: Optional[str] = None
     price: Optional[float] = None
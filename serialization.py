@@ -0,0 +1,228 @@
+# serialization.py
+"""
+Compact serialization of FinalOutputSchema.
+The full schema embeds every product twice (products + comparison.rows);
+the compact form keeps products once and reduces rows to
+{ref: <product index>, score} references. msgpack output is available
+when the package is installed.
+"""
+import time
+from operator import attrgetter
+from functools import lru_cache
+from typing import IO, Any, Dict, Iterable, List, Optional, Tuple, Type
+
+from pydantic import BaseModel, TypeAdapter
+
+from schemas import ComparisonRow, FinalOutputSchema, ProcessedProductSchema
+
+try:
+    import msgpack
+except ImportError:  # optional
+    msgpack = None
+
+COMPACT_FORMAT = "compact-v2"
+
+# ComparisonRow fields that mirror a product; rows matching a product on all
+# of these are stored as {"ref": <index into products>, "score": ...}.
+SHARED_ROW_FIELDS = tuple(
+    f for f in ComparisonRow.model_fields
+    if f in ProcessedProductSchema.model_fields and f not in ("product_id", "score")
+)
+_shared = attrgetter(*SHARED_ROW_FIELDS)
+
+# Payloads mix plain dicts with schema models; one pydantic-core pass
+# serializes the lot (faster here than model_dump() + orjson).
+_PAYLOAD_ADAPTER = TypeAdapter(Dict[str, Any])
+
+_REQUIRED = object()
+
+
+@lru_cache(maxsize=None)
+def _field_defaults(cls: Type[BaseModel]) -> Tuple[Tuple[str, Any], ...]:
+    return tuple(
+        (name, _REQUIRED if field.is_required() else field.get_default(call_default_factory=True))
+        for name, field in cls.model_fields.items()
+    )
+
+
+def _non_default(model: BaseModel, exclude: Tuple[str, ...] = ()) -> Dict[str, Any]:
+    """Top-level fields of model whose value differs from the field default."""
+    values = model.__dict__
+    return {
+        name: values[name]
+        for name, default in _field_defaults(type(model))
+        if name not in exclude and (default is _REQUIRED or values[name] != default)
+    }
+
+
+def _row_id(p: ProcessedProductSchema) -> str:
+    # same fallback ComparisonAgent uses for row ids
+    return p.product_id or p.title[:50]
+
+
+def _matches(row: ComparisonRow, p: ProcessedProductSchema) -> bool:
+    if row.product_id != _row_id(p):
+        return False
+    if p.extra is None:
+        # ComparisonRow.extra is never None; compare the rest field by field
+        return row.extra == {} and all(
+            getattr(row, f) == getattr(p, f) for f in SHARED_ROW_FIELDS if f != "extra"
+        )
+    return _shared(row) == _shared(p)
+
+
+def _row_refs(rows: List[ComparisonRow], products: List[ProcessedProductSchema]) -> List[Any]:
+    """
+    Each row as a reference to the product it was built from. Matching is on
+    every shared field, not just the id, so duplicate ids across sources can
+    never be swapped; a row with no matching product is stored in full.
+    """
+    by_title: Dict[str, List[int]] = {}
+    for i, p in enumerate(products):
+        by_title.setdefault(p.title, []).append(i)
+    used: set = set()
+    refs: List[Any] = []
+    for row in rows:
+        idx = next(
+            (i for i in by_title.get(row.title, ()) if i not in used and _matches(row, products[i])),
+            None,
+        )
+        if idx is None:
+            refs.append(row)
+            continue
+        used.add(idx)
+        ref: Dict[str, Any] = {"ref": idx}
+        if row.score is not None:
+            ref["score"] = row.score
+        refs.append(ref)
+    return refs
+
+
+def _compact_payload(final: FinalOutputSchema) -> Dict[str, Any]:
+    data = _non_default(final, ("products", "comparison"))
+    data["format"] = COMPACT_FORMAT
+    data["products"] = final.products
+    if final.comparison is not None:
+        comp = _non_default(final.comparison, ("rows",))
+        comp["rows"] = _row_refs(final.comparison.rows, final.products)
+        # keyword/domain are required on ComparisonSchema but duplicate the top level
+        if comp.get("keyword") == final.keyword:
+            comp.pop("keyword")
+        if comp.get("domain") == final.domain:
+            comp.pop("domain")
+        data["comparison"] = comp
+    return data
+
+
+def to_compact_dict(final: FinalOutputSchema) -> Dict[str, Any]:
+    """FinalOutputSchema as a dict with rows referencing products by index; default-valued fields dropped."""
+    return _PAYLOAD_ADAPTER.dump_python(_compact_payload(final), mode="json", exclude_defaults=True)
+
+
+def from_compact_dict(data: Dict[str, Any]) -> FinalOutputSchema:
+    """Inverse of to_compact_dict: rebuilds full comparison rows from the referenced products."""
+    data = dict(data)
+    data.pop("format", None)
+    products = [ProcessedProductSchema.model_validate(p) for p in data.get("products", [])]
+    data["products"] = products
+    comp = data.get("comparison")
+    if comp is not None:
+        comp = {"keyword": data["keyword"], "domain": data["domain"], **comp}
+        rows = []
+        for ref in comp.get("rows", []):
+            if "ref" not in ref:
+                rows.append(ref)
+                continue
+            p = products[ref["ref"]]
+            fields = {f: getattr(p, f) for f in SHARED_ROW_FIELDS}
+            fields["extra"] = p.extra or {}
+            rows.append({**fields, "product_id": _row_id(p), "score": ref.get("score")})
+        comp["rows"] = rows
+        data["comparison"] = comp
+    return FinalOutputSchema.model_validate(data)
+
+
+def dumps(final: FinalOutputSchema, compact: bool = True) -> bytes:
+    """
+    JSON bytes; compact form by default. Both forms use pydantic-core's
+    serializer, which benchmarked faster than orjson over model_dump().
+    """
+    if not compact:
+        return final.__pydantic_serializer__.to_json(final)
+    return _PAYLOAD_ADAPTER.dump_json(_compact_payload(final), exclude_defaults=True)
+
+
+def dumps_msgpack(final: FinalOutputSchema) -> bytes:
+    """Compact form as msgpack (requires the msgpack package)."""
+    if msgpack is None:
+        raise RuntimeError("msgpack is not installed")
+    return msgpack.packb(to_compact_dict(final), use_bin_type=True, default=str)
+
+
+def measure(final: FinalOutputSchema) -> Dict[str, Any]:
+    """Payload size (bytes) and serialization time (ms) of pretty, plain and compact output."""
+    result: Dict[str, Any] = {}
+    for name, fn in (
+        ("pretty", lambda: final.__pydantic_serializer__.to_json(final, indent=2)),
+        ("plain", lambda: dumps(final, compact=False)),
+        ("compact", lambda: dumps(final)),
+    ):
+        start = time.perf_counter()
+        payload = fn()
+        result[f"{name}_ms"] = round((time.perf_counter() - start) * 1000, 3)
+        result[f"{name}_bytes"] = len(payload)
+    if result["plain_bytes"]:
+        result["compact_vs_plain_size"] = round(result["compact_bytes"] / result["plain_bytes"], 3)
+    return result
+
+
+# --------------------------------------------------------------------
+# Streaming writer
+# --------------------------------------------------------------------
+class StreamingJSONWriter:
+    """
+    Writes outputs one at a time to a binary file, either as a JSON array
+    or as JSON Lines, so large batches never sit in memory as one document.
+    """
+
+    def __init__(self, fp: IO[bytes], compact: bool = True, jsonl: bool = False):
+        self.fp = fp
+        self.compact = compact
+        self.jsonl = jsonl
+        self.count = 0
+        self.bytes_written = 0
+        self._closed = False
+        if not jsonl:
+            self._write(b"[")
+
+    def _write(self, chunk: bytes) -> None:
+        self.fp.write(chunk)
+        self.bytes_written += len(chunk)
+
+    def write(self, final: FinalOutputSchema) -> None:
+        if self._closed:
+            raise ValueError("writer is closed")
+        payload = dumps(final, compact=self.compact)
+        if self.jsonl:
+            self._write(payload + b"\n")
+        else:
+            self._write(payload if self.count == 0 else b"," + payload)
+        self.count += 1
+
+    def write_all(self, outputs: Iterable[FinalOutputSchema]) -> None:
+        for final in outputs:
+            self.write(final)
+
+    def close(self) -> None:
+        if self._closed:
+            return
+        if not self.jsonl:
+            self._write(b"]")
+        self.fp.flush()
+        self._closed = True
+
+    def __enter__(self) -> "StreamingJSONWriter":
+        return self
+
+    def __exit__(self, *exc: Optional[Any]) -> None:
+        self.close()
@@ -0,0 +1,310 @@
+# structured_output.py
+"""
+Structured-output layer for agents: local JSON repair and fast schema
+validation before falling back to a targeted LLM correction round trip.
+"""
+import re
+import json
+import time
+from functools import lru_cache
+from typing import Any, Callable, Optional, Tuple, Type, TypeVar
+
+from pydantic import BaseModel, TypeAdapter, ValidationError
+
+import prompts
+
+T = TypeVar("T", bound=BaseModel)
+
+_FENCE_RE = re.compile(r"^\s*```(?:json|JSON)?\s*|\s*```\s*$")
+_NUMBER_RE = re.compile(r"-?\d[\d.,]*")
+_GROUPED_COMMAS_RE = re.compile(r"^-?\d{1,3}(,\d{2,3})*,\d{3}$")  # 1,299 / 1,29,999
+_GROUPED_DOTS_RE = re.compile(r"^-?\d{1,3}(\.\d{3}){2,}$")  # 1.299.000
+
+_FLOAT_FIELDS = {"price", "rating", "score", "sentiment_score", "confidence"}
+_INT_FIELDS = {"review_count"}
+_BOUNDED_FIELDS = {"sentiment_score": (-1.0, 1.0), "confidence": (0.0, 1.0)}
+
+
+# --------------------------------------------------------------------
+# Stats
+# --------------------------------------------------------------------
+class StructuredOutputStats:
+    """Counters for how often output validated directly, after repair, or needed a retry."""
+
+    def __init__(self):
+        self.calls = 0
+        self.valid_first_try = 0
+        self.repaired_locally = 0
+        self.llm_retries = 0
+        self.failures = 0
+        self.validation_time_s = 0.0
+
+    def as_dict(self) -> dict:
+        return {
+            "calls": self.calls,
+            "valid_first_try": self.valid_first_try,
+            "repaired_locally": self.repaired_locally,
+            "llm_retries": self.llm_retries,
+            "failures": self.failures,
+            "retry_rate": round(self.llm_retries / self.calls, 4) if self.calls else 0.0,
+            "avg_validation_ms": round(self.validation_time_s * 1000 / self.calls, 3) if self.calls else 0.0,
+        }
+
+
+stats = StructuredOutputStats()
+
+
+# --------------------------------------------------------------------
+# Repair helpers
+# --------------------------------------------------------------------
+@lru_cache(maxsize=None)
+def get_type_adapter(schema: Type[BaseModel]) -> TypeAdapter:
+    """TypeAdapter compiled once per schema."""
+    return TypeAdapter(schema)
+
+
+def _strip_trailing_commas(text: str) -> str:
+    """Drop commas directly followed by } or ], leaving string contents alone."""
+    out = []
+    in_string = escaped = False
+    for i, ch in enumerate(text):
+        if in_string:
+            if escaped:
+                escaped = False
+            elif ch == "\\":
+                escaped = True
+            elif ch == '"':
+                in_string = False
+        elif ch == '"':
+            in_string = True
+        elif ch == ",":
+            rest = text[i + 1:].lstrip()
+            if rest[:1] in ("}", "]"):
+                continue
+        out.append(ch)
+    return "".join(out)
+
+
+def repair_json_text(text: str) -> Any:
+    """
+    Strip code fences / surrounding prose, then parse. Trailing commas are
+    only removed if the text still fails to parse.
+    """
+    text = _FENCE_RE.sub("", text.strip())
+    start = min((i for i in (text.find("{"), text.find("[")) if i != -1), default=-1)
+    if start != -1:
+        end = max(text.rfind("}"), text.rfind("]"))
+        if end > start:
+            text = text[start:end + 1]
+    try:
+        return json.loads(text)
+    except ValueError:
+        return json.loads(_strip_trailing_commas(text))
+
+
+def _loads(text: str) -> Any:
+    try:
+        return json.loads(text)
+    except ValueError:
+        return repair_json_text(text)
+
+
+def _parse_number(raw: str) -> float:
+    """Handles '1,299.00', '1,29,999', '1.299,00' and '12,5' style separators."""
+    raw = raw.rstrip(".,")
+    if "," in raw and "." in raw:
+        # whichever separator comes last is the decimal point
+        if raw.rfind(",") > raw.rfind("."):
+            raw = raw.replace(".", "").replace(",", ".")
+        else:
+            raw = raw.replace(",", "")
+    elif "," in raw:
+        raw = raw.replace(",", "") if _GROUPED_COMMAS_RE.match(raw) else raw.replace(",", ".")
+    elif _GROUPED_DOTS_RE.match(raw):
+        raw = raw.replace(".", "")
+    return float(raw)
+
+
+def _to_number(value: Any) -> Any:
+    """'₹1,299.00' -> 1299.0, '1.299,00 €' -> 1299.0, '95%' -> 0.95; no number -> None."""
+    if not isinstance(value, str):
+        return value
+    m = _NUMBER_RE.search(value)
+    if not m:
+        return None
+    try:
+        number = _parse_number(m.group())
+    except ValueError:
+        return None
+    return number / 100 if value.strip().endswith("%") else number
+
+
+def _bound(field: str, value: float) -> float:
+    """
+    Clamp small overshoots (within one range width, e.g. sentiment_score 1.7)
+    and rescale percentages for 0..1 fields (confidence 85 -> 0.85). Anything
+    else is left out of range for the field-level correction prompt.
+    """
+    lo, hi = _BOUNDED_FIELDS[field]
+    if lo <= value <= hi:
+        return value
+    width = hi - lo
+    if lo - width <= value <= hi + width:
+        return max(lo, min(hi, value))
+    if (lo, hi) == (0.0, 1.0) and hi < value <= 100:
+        return value / 100
+    return value
+
+
+def _apply_defaults(content: dict, defaults: dict) -> dict:
+    """Fill known fields the model left out or returned as null."""
+    return {**content, **{k: v for k, v in defaults.items() if content.get(k) is None}}
+
+
+def coerce_fields(data: Any) -> Any:
+    """Coerce price-like strings to numbers and bring bounded scores into range, recursively."""
+    if isinstance(data, list):
+        return [coerce_fields(v) for v in data]
+    if not isinstance(data, dict):
+        return data
+    out = {}
+    for k, v in data.items():
+        if k in _FLOAT_FIELDS or k in _INT_FIELDS:
+            v = _to_number(v)
+            if k in _INT_FIELDS and isinstance(v, float):
+                v = int(v)
+            if k in _BOUNDED_FIELDS and isinstance(v, (int, float)):
+                v = _bound(k, v)
+        elif k == "sentiment" and isinstance(v, str):
+            v = v.strip().lower()
+        else:
+            v = coerce_fields(v)
+        out[k] = v
+    return out
+
+
+def _content_of(result: Any) -> Any:
+    """Last message content of an agent TaskResult (str or structured model)."""
+    messages = getattr(result, "messages", None)
+    if messages:
+        return getattr(messages[-1], "content", messages[-1])
+    return result
+
+
+def _format_errors(err: ValidationError) -> str:
+    return "\n".join(
+        f"- {'.'.join(str(p) for p in e['loc']) or '<root>'}: {e['msg']}" for e in err.errors()
+    )
+
+
+def _validate(content: Any, schema: Type[T], defaults: Optional[dict] = None) -> Tuple[T, bool]:
+    """Validate content against schema; returns (model, repaired_locally)."""
+    adapter = get_type_adapter(schema)
+    if isinstance(content, BaseModel):
+        content = content.model_dump()
+    if isinstance(content, str) and not defaults:
+        try:
+            return adapter.validate_json(content), False
+        except ValidationError:
+            content = _loads(content)
+    else:
+        if isinstance(content, str):
+            content = _loads(content)
+        if defaults and isinstance(content, dict):
+            content = _apply_defaults(content, defaults)
+        try:
+            return adapter.validate_python(content), False
+        except ValidationError:
+            pass
+    return adapter.validate_python(coerce_fields(content)), True
+
+
+def parse_with_schema(content: Any, schema: Type[T], defaults: Optional[dict] = None) -> T:
+    """
+    Validate agent output against schema, repairing locally first.
+    `defaults` fills fields the caller already knows (e.g. keyword) when missing.
+    Raises ValidationError / ValueError if the output cannot be repaired.
+    """
+    return _validate(content, schema, defaults)[0]
+
+
+# --------------------------------------------------------------------
+# run_with_schema
+# --------------------------------------------------------------------
+async def _call_model(model, system_message: Optional[str], task: str) -> Any:
+    """
+    One stateless model call. Chat completion clients get exactly
+    [system, user]; a (tool-using) AssistantAgent is reset first so no
+    earlier exchange leaks into this one.
+    """
+    from autogen_core import CancellationToken
+    from autogen_core.models import SystemMessage, UserMessage
+
+    if hasattr(model, "create"):
+        messages = [SystemMessage(content=system_message)] if system_message else []
+        messages.append(UserMessage(content=task, source="user"))
+        result = await model.create(messages)
+        return result.content
+    await model.on_reset(CancellationToken())
+    return _content_of(await model.run(task=task))
+
+
+async def run_with_schema(
+    model,
+    msg,
+    schema: Type[T],
+    system_message: Optional[str] = None,
+    max_retries: int = 1,
+    defaults: Optional[dict] = None,
+    fallback_model=None,
+    on_attempt: Optional[Callable[[bool, float, bool], None]] = None,
+) -> T:
+    """
+    Run a model (chat completion client, or AssistantAgent when tools are
+    needed) and return its output as `schema`. Every attempt is a
+    standalone call, so this is safe to run concurrently.
+    Invalid JSON is repaired locally; only if that fails is the model re-asked,
+    with a correction prompt that repeats the original task and lists the
+    offending fields. Retries go to `fallback_model` (e.g. a stronger model
+    tier) when given. `on_attempt(escalated, latency_s, ok)` is called after
+    every model call.
+    """
+    original = getattr(msg, "content", msg)
+    task = original
+    stats.calls += 1
+    retried = False
+    for attempt in range(max_retries + 1):
+        escalated = retried and fallback_model is not None
+        call_start = time.perf_counter()
+        try:
+            content = await _call_model(fallback_model if escalated else model, system_message, task)
+        except Exception:
+            # timeouts, 429s, transport errors: report them before propagating
+            if on_attempt is not None:
+                on_attempt(escalated, time.perf_counter() - call_start, False)
+            raise
+        latency = time.perf_counter() - call_start
+
+        start = time.perf_counter()
+        ok = False
+        try:
+            parsed, repaired = _validate(content, schema, defaults)
+            ok = True
+            if repaired:
+                stats.repaired_locally += 1
+            elif not retried:
+                stats.valid_first_try += 1
+            return parsed
+        except (ValidationError, ValueError) as e:
+            if attempt >= max_retries:
+                stats.failures += 1
+                raise
+            errors = _format_errors(e) if isinstance(e, ValidationError) else f"- <root>: invalid JSON ({e})"
+            print(f"[run_with_schema] {schema.__name__} invalid, asking model to fix:\n{errors}")
+            task = prompts.schema_correction_prompt(schema.__name__, errors, str(content), original)
+            stats.llm_retries += 1
+            retried = True
+        finally:
+            stats.validation_time_s += time.perf_counter() - start
+            if on_attempt is not None:
+                on_attempt(escalated, latency, ok)
@@ -0,0 +1,92 @@
+from connector_health import CLOSED, HALF_OPEN, OPEN, ConnectorHealth, ConnectorHealthRegistry
+
+
+class FakeClock:
+    def __init__(self):
+        self.now = 0.0
+
+    def __call__(self):
+        return self.now
+
+
+def _health(clock, **kwargs):
+    return ConnectorHealth("serp", failure_threshold=3, empty_threshold=3, cooldown_s=30.0, clock=clock, **kwargs)
+
+
+def test_opens_after_consecutive_failures():
+    clock = FakeClock()
+    h = _health(clock)
+    for _ in range(2):
+        assert h.allow()
+        h.record_failure(0.1, "boom")
+    assert h.state == CLOSED
+    h.record_failure(0.1, "boom")
+    assert h.state == OPEN
+    assert not h.allow()
+
+
+def test_half_open_single_probe_then_close():
+    clock = FakeClock()
+    h = _health(clock)
+    for _ in range(3):
+        h.record_failure(0.1, "boom")
+    clock.now = 30.0
+    assert h.allow()
+    assert h.state == HALF_OPEN
+    assert not h.allow()  # only one probe in flight
+    h.record_success(0.2, 4)
+    assert h.state == CLOSED
+    assert h.cooldown_s == 30.0
+
+
+def test_failed_probe_reopens_with_longer_cooldown():
+    clock = FakeClock()
+    h = _health(clock)
+    for _ in range(3):
+        h.record_failure(0.1, "boom")
+    clock.now = 30.0
+    assert h.allow()
+    h.record_failure(0.1, "still down")
+    assert h.state == OPEN
+    assert h.cooldown_s == 60.0
+    clock.now = 59.0
+    assert not h.allow()
+    clock.now = 90.0
+    assert h.allow()
+
+
+def test_empty_results_trip_breaker():
+    clock = FakeClock()
+    h = _health(clock)
+    for _ in range(3):
+        assert h.allow()
+        h.record_success(0.1, 0)
+    assert h.state == OPEN
+    assert h.snapshot().consecutive_empty == 3
+
+
+def test_empty_probe_reopens():
+    clock = FakeClock()
+    h = _health(clock)
+    for _ in range(3):
+        h.record_success(0.1, 0)
+    clock.now = 30.0
+    assert h.allow()
+    h.record_success(0.1, 0)
+    assert h.state == OPEN
+
+
+def test_registry_orders_by_yield_untried_first():
+    def fast():
+        pass
+
+    def slow():
+        pass
+
+    def untried():
+        pass
+
+    reg = ConnectorHealthRegistry()
+    reg.get(slow).record_success(2.0, 2)
+    reg.get(fast).record_success(0.5, 5)
+    assert reg.order([slow, fast, untried]) == [untried, fast, slow]
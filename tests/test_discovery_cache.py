@@ -0,0 +1,78 @@
+from discovery_cache import DiscoveryCache, normalize_keyword
+from schemas import DiscoveredProduct, DiscoveryOutput
+
+
+def _out(keyword, domain="physical_product", platforms=("amazon",)):
+    return DiscoveryOutput(
+        keyword=keyword,
+        domain=domain,
+        confidence=0.9,
+        recommended_platforms=list(platforms),
+        products=[DiscoveredProduct(title=f"{keyword} top pick", url="https://example.com/p")],
+    )
+
+
+def test_normalize_keyword():
+    assert normalize_keyword("  iPhone-15  Pro! ") == "iphone 15 pro"
+
+
+def test_exact_hit_returns_whole_result_relabelled():
+    cache = DiscoveryCache()
+    cache.put("iPhone 15", _out("iPhone 15"))
+    hit = cache.get("iphone 15!")
+    assert hit.keyword == "iphone 15!"
+    assert hit.products[0].title == "iPhone 15 top pick"
+    assert cache.hits["exact"] == 1
+
+
+def test_fuzzy_hit_reuses_domain_only():
+    cache = DiscoveryCache()
+    cache.put("back heating pads", _out("back heating pads"))
+    hit = cache.get("back heating pad")
+    assert hit.domain == "physical_product"
+    assert hit.recommended_platforms == ["amazon"]
+    assert hit.products == []
+    assert cache.hits["fuzzy"] == 1
+
+
+def test_fuzzy_hit_requires_same_model_numbers():
+    cache = DiscoveryCache()
+    cache.put("iphone 14 pro", _out("iphone 14 pro"))
+    cache.put("samsung galaxy s23", _out("samsung galaxy s23"))
+    assert cache.get("iphone 15 pro") is None
+    assert cache.get("samsung galaxy s24") is None
+
+
+def test_fuzzy_hit_requires_same_domain_hints():
+    cache = DiscoveryCache()
+    cache.put("nike running shoes", _out("nike running shoes"))
+    assert cache.get("nike running shoes app") is None
+
+
+def test_classifier_needs_real_history():
+    cache = DiscoveryCache(min_history=3)
+    # seeds alone never answer, even for a keyword they contain
+    assert cache.predict("iphone 15") is None
+    for kw in ("iphone 13", "iphone 14 plus", "iphone 12 mini"):
+        cache.put(kw, _out(kw, platforms=("amazon", "flipkart")))
+    pred = cache.predict("iphone 15")
+    assert pred is not None
+    assert pred.domain == "physical_product"
+    assert pred.recommended_platforms == ["amazon", "flipkart"]
+    assert pred.products == []
+
+
+def test_classifier_requires_word_support():
+    cache = DiscoveryCache(min_history=3)
+    for kw in ("iphone 13", "iphone 14 plus", "iphone 12 mini"):
+        cache.put(kw, _out(kw))
+    assert cache.predict("zzqx") is None
+
+
+def test_persists_to_disk(tmp_path):
+    path = str(tmp_path / "discovery.json")
+    cache = DiscoveryCache(path=path)
+    cache.put("wireless earbuds", _out("wireless earbuds"))
+    reloaded = DiscoveryCache(path=path)
+    assert reloaded.get("wireless earbuds").domain == "physical_product"
+    assert reloaded.classifier.history == 1
@@ -0,0 +1,51 @@
+import pytest
+
+pytest.importorskip("autogen_ext")
+
+from model import DEFAULT_ROUTES, DEFAULT_TIER_MODELS, ModelRouter  # noqa: E402
+
+
+@pytest.fixture
+def router(monkeypatch):
+    for name in [f"MODEL_TIER_{t.upper()}" for t in DEFAULT_TIER_MODELS]:
+        monkeypatch.delenv(name, raising=False)
+    for name in [f"MODEL_ROUTE_{t.upper()}" for t in DEFAULT_ROUTES]:
+        monkeypatch.delenv(name, raising=False)
+    return ModelRouter()
+
+
+def test_tier_for_default_routes(router):
+    assert router.tier_for("processing") == "fast"
+    assert router.tier_for("retrieval") == "fast"
+    assert router.tier_for("discovery") == "strong"
+    assert router.tier_for("comparison") == "strong"
+    # unknown tasks get the strongest tier
+    assert router.tier_for("unknown") == "strong"
+
+
+def test_env_overrides(monkeypatch):
+    monkeypatch.setenv("MODEL_ROUTE_PROCESSING", "strong")
+    monkeypatch.setenv("MODEL_TIER_FAST", "my-fast-model")
+    r = ModelRouter()
+    assert r.tier_for("processing") == "strong"
+    assert r.tier_models["fast"] == "my-fast-model"
+
+
+def test_escalation_tier(router):
+    assert router.escalation_tier("fast") == "strong"
+    assert router.escalation_tier("strong") is None
+
+
+def test_recorder_accounts_per_tier(router):
+    record = router.recorder("processing", "fast")
+    record(False, 0.2, False)  # fast tier output failed validation
+    record(True, 0.5, True)  # escalated retry on the strong tier
+    stats = router.stats()
+    assert stats["decisions"]["processing"] == {"fast": 1, "strong:escalated": 1}
+    assert stats["tiers"]["fast"]["calls"] == 1
+    assert stats["tiers"]["fast"]["failures"] == 1
+    assert stats["tiers"]["fast"]["avg_latency_ms"] == 200.0
+    assert stats["tiers"]["strong"]["calls"] == 1
+    assert stats["tiers"]["strong"]["failures"] == 0
+    assert stats["tiers"]["strong"]["max_latency_ms"] == 500.0
+
@@ -0,0 +1,75 @@
+from product_index import HashingEmbedder, ProductIndex
+from schemas import ProcessedProductSchema, RawProductSchema
+
+XM5 = (
+    "Sony WH-1000XM5 Wireless Industry Leading Noise Canceling Headphones "
+    "with Auto Noise Canceling Optimizer, Black"
+)
+XM4 = XM5.replace("XM5", "XM4")
+
+
+def _processed(product_id, title, source="amazon.in", summary="summary"):
+    return ProcessedProductSchema(
+        product_id=product_id, title=title, source=source, summary=summary, pros=["good"], cons=["pricey"]
+    )
+
+
+def _raw(product_id, title, source="amazon.in"):
+    return RawProductSchema(product_id=product_id, title=title, source=source)
+
+
+def test_lookup_by_source_and_id():
+    index = ProductIndex()
+    index.add([_processed("B01", XM4, summary="xm4")])
+    assert index.lookup(_raw("B01", "renamed listing")).summary == "xm4"
+    assert index.lookup(_raw("B01", "renamed listing", source="flipkart")) is None
+
+
+def test_lookup_by_near_identical_title():
+    index = ProductIndex()
+    index.add([_processed("B01", XM4, summary="xm4")])
+    # different id, same product modulo case/punctuation
+    hit = index.lookup(_raw("F99", XM4.lower().replace(",", "")))
+    assert hit.summary == "xm4"
+    assert index.hits == 1
+
+
+def test_lookup_rejects_different_model_number():
+    index = ProductIndex()
+    index.add([_processed("B01", XM4, summary="xm4")])
+    embed = HashingEmbedder()
+    a, b = embed([XM5 + " amazon.in", XM4 + " amazon.in"])
+    assert float(a @ b) >= index.reuse_threshold  # would have matched on similarity alone
+    assert index.lookup(_raw("B02", XM5)) is None
+    assert index.misses == 1
+
+
+def test_add_refreshes_existing_key():
+    index = ProductIndex()
+    index.add([_processed("B01", XM4, summary="old")])
+    index.add([_processed("B01", XM4, summary="new")])
+    assert len(index) == 1
+    assert index.lookup(_raw("B01", XM4)).summary == "new"
+
+
+def test_similar_ranks_closest_first():
+    index = ProductIndex()
+    index.add([
+        _processed("B01", XM4),
+        _processed("B02", "Electric back heating pad with auto shut-off"),
+    ])
+    top = index.similar("heating pad for back", k=2)
+    assert top[0][0].product_id == "B02"
+    assert top[0][1] > top[1][1]
+
+
+def test_save_load_round_trip(tmp_path):
+    path = str(tmp_path / "idx" / "products")
+    index = ProductIndex(path=path)
+    index.add([_processed("B01", XM4, summary="xm4"), _processed("B02", XM5, summary="xm5")])
+    index.save()
+    reloaded = ProductIndex(path=path)
+    assert len(reloaded) == 2
+    assert reloaded.items == index.items
+    assert reloaded.lookup(_raw("B02", XM5)).summary == "xm5"
+    assert reloaded.lookup(_raw("F1", XM5, source="amazon.in")).summary == "xm5"
@@ -0,0 +1,123 @@
+import io
+import json
+
+from schemas import (
+    ComparisonRow,
+    ComparisonSchema,
+    FinalOutputSchema,
+    ProcessedProductSchema,
+)
+import serialization
+
+
+def _row(p: ProcessedProductSchema, score: float) -> ComparisonRow:
+    # mirrors ComparisonAgent.run
+    return ComparisonRow(
+        product_id=p.product_id or p.title[:50],
+        title=p.title,
+        price=p.price,
+        currency=p.currency,
+        rating=p.rating,
+        review_count=p.review_count,
+        pros=p.pros,
+        cons=p.cons,
+        summary=p.summary,
+        url=p.url,
+        source=p.source,
+        score=score,
+        extra=p.extra,
+    )
+
+
+def _final() -> FinalOutputSchema:
+    long_title = "Back heating pad with auto shut-off and washable cover, extra large "
+    products = [
+        ProcessedProductSchema(product_id="B01", title="Pad A", source="amazon.in", price=999.0, pros=["warm"]),
+        ProcessedProductSchema(product_id="B01", title="Pad B", source="flipkart", price=1299.0, cons=["bulky"]),
+        ProcessedProductSchema(title=long_title + "(blue)", source="amazon.in", price=1500.0),
+        ProcessedProductSchema(title=long_title + "(grey)", source="amazon.in", price=1600.0),
+    ]
+    rows = sorted(
+        (_row(p, s) for p, s in zip(products, [0.5, 0.9, 0.7, 0.7])),
+        key=lambda r: r.score,
+        reverse=True,
+    )
+    comparison = ComparisonSchema(
+        keyword="heating pad", domain="physical_product", rows=rows, best_overall="Pad B"
+    )
+    return FinalOutputSchema(
+        keyword="heating pad",
+        domain="physical_product",
+        top_recommendation="Pad B",
+        products=products,
+        comparison=comparison,
+    )
+
+
+def test_compact_round_trip_with_duplicate_ids():
+    final = _final()
+    back = serialization.from_compact_dict(json.loads(serialization.dumps(final)))
+    assert back == final
+    assert back.products[2].product_id is None
+
+
+def test_compact_rows_reference_products():
+    data = serialization.to_compact_dict(_final())
+    assert all(set(r) <= {"ref", "score"} for r in data["comparison"]["rows"])
+
+
+def test_compact_is_smaller_than_plain():
+    final = _final()
+    assert len(serialization.dumps(final)) < len(serialization.dumps(final, compact=False))
+
+
+def test_streaming_writer_json_array():
+    final = _final()
+    buf = io.BytesIO()
+    with serialization.StreamingJSONWriter(buf) as writer:
+        writer.write_all([final, final])
+    decoded = json.loads(buf.getvalue())
+    assert [serialization.from_compact_dict(d) for d in decoded] == [final, final]
+
+
+def test_streaming_writer_jsonl():
+    final = _final()
+    buf = io.BytesIO()
+    with serialization.StreamingJSONWriter(buf, jsonl=True) as writer:
+        writer.write_all([final, final])
+    lines = buf.getvalue().splitlines()
+    assert [serialization.from_compact_dict(json.loads(line)) for line in lines] == [final, final]
+
+
+def test_full_dumps_returns_bytes():
+    final = _final()
+    final.products[0].summary = "Costs ₹999"
+    payload = serialization.dumps(final, compact=False)
+    assert isinstance(payload, bytes)
+    assert FinalOutputSchema.model_validate_json(payload) == final
+
+
+def test_streaming_writer_full_json_array():
+    final = _final()
+    buf = io.BytesIO()
+    with serialization.StreamingJSONWriter(buf, compact=False) as writer:
+        writer.write_all([final, final])
+    assert [FinalOutputSchema.model_validate(d) for d in json.loads(buf.getvalue())] == [final, final]
+    assert writer.bytes_written == len(buf.getvalue())
+
+
+def test_streaming_writer_full_jsonl():
+    final = _final()
+    buf = io.BytesIO()
+    with serialization.StreamingJSONWriter(buf, compact=False, jsonl=True) as writer:
+        writer.write_all([final, final])
+    lines = buf.getvalue().splitlines()
+    assert [FinalOutputSchema.model_validate_json(line) for line in lines] == [final, final]
+
+
+def test_measure_counts_bytes():
+    final = _final()
+    final.insights = "₹" * 10
+    stats = serialization.measure(final)
+    assert stats["plain_bytes"] == len(final.model_dump_json().encode("utf-8"))
+    assert stats["pretty_bytes"] == len(final.model_dump_json(indent=2).encode("utf-8"))
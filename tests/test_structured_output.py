@@ -0,0 +1,76 @@
+import pytest
+from pydantic import ValidationError
+
+from schemas import ComparisonSchema, DiscoveryOutput, ProcessedProductSchema
+from structured_output import _to_number, coerce_fields, parse_with_schema, repair_json_text
+
+
+def test_strips_code_fences_and_prose():
+    text = 'Here you go:\n```json\n{"title": "Pad"}\n```'
+    assert repair_json_text(text) == {"title": "Pad"}
+
+
+def test_trailing_commas_removed_outside_strings_only():
+    data = repair_json_text('{"title": "a, }", "pros": ["x",], "cons": ["y, ]",],}')
+    assert data == {"title": "a, }", "pros": ["x"], "cons": ["y, ]"]}
+
+
+def test_valid_json_is_not_rewritten():
+    p = parse_with_schema('{"title": "a, ]", "price": "₹1,299"}', ProcessedProductSchema)
+    assert p.title == "a, ]"
+    assert p.price == 1299.0
+
+
+@pytest.mark.parametrize(
+    "raw, expected",
+    [
+        ("₹1,299", 1299.0),
+        ("₹1,29,999.50", 129999.5),
+        ("1.299,00 €", 1299.0),
+        ("$1,299.00", 1299.0),
+        ("12,5", 12.5),
+        ("95%", 0.95),
+        ("n/a", None),
+    ],
+)
+def test_to_number(raw, expected):
+    assert _to_number(raw) == expected
+
+
+def test_small_overshoot_is_clamped():
+    assert coerce_fields({"sentiment_score": 1.7})["sentiment_score"] == 1.0
+    assert coerce_fields({"sentiment_score": -1.2})["sentiment_score"] == -1.0
+
+
+def test_percent_confidence_is_rescaled_not_clamped():
+    assert coerce_fields({"confidence": 85})["confidence"] == 0.85
+    assert coerce_fields({"confidence": "85%"})["confidence"] == 0.85
+
+
+def test_far_out_of_range_is_left_for_the_model():
+    with pytest.raises(ValidationError):
+        parse_with_schema('{"title": "t", "sentiment_score": 40}', ProcessedProductSchema)
+    with pytest.raises(ValidationError):
+        parse_with_schema(
+            '{"keyword": "k", "domain": "app", "confidence": 250, "products": []}', DiscoveryOutput
+        )
+
+
+def test_defaults_fill_missing_and_null_fields():
+    comp = parse_with_schema(
+        '{"keyword": null, "best_overall": "Pad"}',
+        ComparisonSchema,
+        defaults={"keyword": "heating pad", "domain": "physical_product"},
+    )
+    assert comp.keyword == "heating pad"
+    assert comp.domain == "physical_product"
+    assert comp.best_overall == "Pad"
+
+
+def test_defaults_do_not_override_model_values():
+    comp = parse_with_schema(
+        '{"keyword": "pad", "domain": "app"}',
+        ComparisonSchema,
+        defaults={"keyword": "heating pad", "domain": "physical_product"},
+    )
+    assert (comp.keyword, comp.domain) == ("pad", "app")